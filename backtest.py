@@ -0,0 +1,165 @@
+"""Backtest a candidate model against the stored analysis history.
+
+Replays every saved analysis through the current model and a candidate in
+parallel worker processes, using the same feature encoding as the dashboard,
+and reports label agreement, the current-vs-candidate confusion table and
+throughput.
+
+Usage:
+    python backtest.py --candidate ml/candidate_model.pkl
+    python backtest.py --shadow-report
+
+To shadow a candidate on live traffic, copy it to ml/candidate_model.pkl
+(and optionally ml/candidate_scaler.pkl). The dashboard will then score every
+new analysis with it and log the result to data/shadow_log.jsonl, while users
+keep seeing the current model's diagnosis.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from pages.utils import (
+    load_analysis, load_shadow_log, encode_features, DISORDERS,
+    candidate_scaler_file, MODEL_FILE, SCALER_FILE, CANDIDATE_MODEL_FILE
+)
+
+# Per-process models, loaded once by the pool initializer
+_models = {}
+
+
+def _init_worker(current_paths, candidate_paths):
+    _models["current"] = tuple(joblib.load(p) for p in current_paths)
+    _models["candidate"] = tuple(joblib.load(p) for p in candidate_paths)
+
+
+def _predict(name, features):
+    model, scaler = _models[name]
+    return model.predict(scaler.transform(features)).astype(int)
+
+
+def _score_chunk(records):
+    # Rows with unknown category values can't be encoded, so skip them
+    features = encode_features(records)
+    valid = ~np.isnan(features).any(axis=1)
+    features = features[valid]
+    if not len(features):
+        return [], [], [], int((~valid).sum())
+    stored = [r.get("diagnosis", "Unknown") for r, ok in zip(records, valid) if ok]
+    current = [DISORDERS.get(p, "Unknown") for p in _predict("current", features)]
+    candidate = [DISORDERS.get(p, "Unknown") for p in _predict("candidate", features)]
+    return stored, current, candidate, int((~valid).sum())
+
+
+def _chunks(records, size):
+    for i in range(0, len(records), size):
+        yield records[i:i + size]
+
+
+def agreement_report(stored, current, candidate):
+    total = len(current)
+    report = {
+        "records": total,
+        "candidate_agrees_with_current": round(sum(a == b for a, b in zip(current, candidate)) / total, 4) if total else 0.0,
+        "confusion": {}
+    }
+    if stored is not None:
+        report["current_agrees_with_stored"] = round(sum(a == b for a, b in zip(stored, current)) / total, 4) if total else 0.0
+        report["candidate_agrees_with_stored"] = round(sum(a == b for a, b in zip(stored, candidate)) / total, 4) if total else 0.0
+    if total:
+        confusion = pd.crosstab(pd.Series(current, name="current"), pd.Series(candidate, name="candidate"))
+        report["confusion"] = {row: {col: int(n) for col, n in confusion.loc[row].items()} for row in confusion.index}
+    return report
+
+
+def run_backtest(args):
+    history = load_analysis()
+    current_paths = (args.model, args.scaler)
+    candidate_scaler = args.candidate_scaler
+    if candidate_scaler is None:
+        # The shadow scaler only belongs with the shadow candidate model
+        candidate_scaler = candidate_scaler_file() if args.candidate == CANDIDATE_MODEL_FILE else args.scaler
+    candidate_paths = (args.candidate, candidate_scaler)
+
+    # Fail here rather than with a BrokenProcessPool from every worker
+    missing = [p for p in current_paths + candidate_paths if not os.path.exists(p)]
+    if missing:
+        sys.exit(f"Model file(s) not found: {', '.join(missing)}")
+
+    stored, current, candidate = [], [], []
+    skipped = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(current_paths, candidate_paths)) as pool:
+        for chunk_stored, chunk_current, chunk_candidate, chunk_skipped in pool.map(
+                _score_chunk, _chunks(history, args.chunk_size)):
+            stored.extend(chunk_stored)
+            current.extend(chunk_current)
+            candidate.extend(chunk_candidate)
+            skipped += chunk_skipped
+    wall = time.perf_counter() - start
+
+    report = agreement_report(stored, current, candidate)
+    report["skipped"] = skipped
+    report["workers"] = args.workers or os.cpu_count()
+    report["wall_seconds"] = round(wall, 3)
+    report["records_per_second"] = round(len(current) / wall, 1) if wall else 0.0
+    return report
+
+
+def run_shadow_report():
+    entries = load_shadow_log()
+    current = [e["diagnosis"] for e in entries]
+    candidate = [e["candidate_diagnosis"] for e in entries]
+    return agreement_report(None, current, candidate)
+
+
+def print_report(report):
+    print(f"Records compared: {report['records']}")
+    if "skipped" in report:
+        print(f"Skipped (unencodable): {report['skipped']}")
+    print(f"Candidate agrees with current model: {report['candidate_agrees_with_current']:.2%}")
+    if "current_agrees_with_stored" in report:
+        print(f"Current model agrees with stored diagnosis: {report['current_agrees_with_stored']:.2%}")
+        print(f"Candidate agrees with stored diagnosis: {report['candidate_agrees_with_stored']:.2%}")
+    if "wall_seconds" in report:
+        print(f"{report['workers']} workers, {report['wall_seconds']}s, {report['records_per_second']} records/s")
+    if report["confusion"]:
+        print()
+        print("Confusion (rows: current, columns: candidate)")
+        print(pd.DataFrame(report["confusion"]).T.fillna(0).astype(int).to_string())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest a candidate model over the stored analysis history")
+    parser.add_argument("--candidate", default=CANDIDATE_MODEL_FILE, help="candidate model pickle")
+    parser.add_argument("--candidate-scaler", help="candidate scaler pickle (defaults to the current scaler, or to "
+                             "ml/candidate_scaler.pkl if present when the candidate is ml/candidate_model.pkl)")
+    parser.add_argument("--model", default=MODEL_FILE, help="current model pickle")
+    parser.add_argument("--scaler", default=SCALER_FILE, help="current scaler pickle")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (defaults to CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="records per worker task")
+    parser.add_argument("--shadow-report", action="store_true",
+                        help="summarize the live shadow log instead of replaying history")
+    parser.add_argument("--json", metavar="FILE", help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = run_shadow_report() if args.shadow_report else run_backtest(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
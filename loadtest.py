@@ -0,0 +1,395 @@
+"""Headless load test for the Streamlit pages.
+
+Drives pages/*.py through Streamlit's AppTest (no browser, no network) with
+many concurrent simulated sessions and reports per-page rerun latency,
+memory per session and throughput.
+
+Usage:
+    python loadtest.py --sessions 50 --admins 5 --users 10000 --records 100000
+
+Every run works in a throwaway directory seeded with synthetic data, so the
+real data/users.json and data/analysis_history.json are never touched.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from pages.utils import save_users, save_analysis
+from services.search_index import rebuild_search_index
+from services.cohort_cube import rebuild_cube
+from services.drift_stats import rebuild_drift_stats
+from services.user_trends import rebuild_user_trends
+
+GENDERS = ["Male", "Female", "Other"]
+ALCOHOL = ["None", "Light", "Moderate", "Heavy"]
+SMOKING = ["Never", "Former", "Current"]
+SNORING = ["No", "Yes"]
+DIAGNOSES = ["None", "Insomnia", "Sleep Apnea", "Narcolepsy"]
+PASSWORD = "loadtest123"
+
+
+def page_path(name):
+    return os.path.join(ROOT, "pages", name)
+
+
+# ---------- synthetic data ----------
+
+def synthetic_record(email, when, rng):
+    return {
+        "email": email,
+        "date": when.strftime("%Y-%m-%d %H:%M:%S"),
+        "age": rng.randint(18, 80),
+        "gender": rng.choice(GENDERS),
+        "sleep_duration": round(rng.uniform(3.0, 10.0), 1),
+        "stress_level": rng.randint(0, 10),
+        "systolic_bp": rng.randint(95, 170),
+        "diastolic_bp": rng.randint(60, 110),
+        "heart_rate": rng.randint(50, 110),
+        "daily_steps": rng.randint(1000, 20000),
+        "caffeine_intake": rng.randint(0, 500),
+        "alcohol": rng.choice(ALCOHOL),
+        "smoking": rng.choice(SMOKING),
+        "snoring": rng.choice(SNORING),
+        "bmi": round(rng.uniform(17.0, 40.0), 1),
+        "diagnosis": rng.choice(DIAGNOSES)
+    }
+
+
+def seed_data(n_users, n_records, rng):
+    # Hashing is deliberately slow, so every synthetic user shares one hash
+    hashed_password = generate_password_hash(PASSWORD)
+    users = {}
+    for i in range(n_users):
+        email = f"seed{i}@example.com"
+        users[email] = {
+            "name": f"Seed User {i}",
+            "email": email,
+            "phone": f"+1555{i:07d}",
+            "password": hashed_password
+        }
+    save_users(users)
+
+    emails = list(users) or ["seed0@example.com"]
+    start = datetime.now() - timedelta(days=365)
+    history = []
+    for i in range(n_records):
+        when = start + timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        history.append(synthetic_record(rng.choice(emails), when, rng))
+    history.sort(key=lambda x: x["date"])
+    save_analysis(history)
+    rebuild_search_index()
+    rebuild_cube()
+    rebuild_drift_stats()
+    rebuild_user_trends()
+
+
+def prepare_workspace(keep):
+    workdir = tempfile.mkdtemp(prefix="sleep-loadtest-") if not keep else os.path.abspath(keep)
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    ml_dir = os.path.join(workdir, "ml")
+    if not os.path.exists(ml_dir):
+        try:
+            os.symlink(os.path.join(ROOT, "ml"), ml_dir)
+        except OSError:
+            shutil.copytree(os.path.join(ROOT, "ml"), ml_dir)
+    return workdir
+
+
+# ---------- measurement ----------
+
+class LoadStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.failures = defaultdict(int)
+        self.journeys = 0
+        self.failed_journeys = 0
+
+    def record(self, page, seconds, failed):
+        with self.lock:
+            self.latencies[page].append(seconds)
+            if failed:
+                self.errors[page] += 1
+
+    def fail(self, step, reason):
+        # Keyed by step and reason so the report can say why journeys failed
+        with self.lock:
+            self.failures[f"{step}: {reason[:200]}"] += 1
+
+    def journey(self, ok):
+        with self.lock:
+            self.journeys += 1
+            if not ok:
+                self.failed_journeys += 1
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def max_rss_kb():
+    # ru_maxrss is a high-water mark, in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 if sys.platform == "darwin" else rss
+
+
+def current_rss_kb():
+    """Resident memory right now, after collecting garbage.
+
+    Reads VmRSS from /proc. Where that doesn't exist, falls back to the
+    high-water mark, which understates per-session growth if an earlier
+    phase (like seeding) peaked higher.
+    """
+    gc.collect()
+    try:
+        with open("/proc/self/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return float(line.split()[1])
+    except OSError:
+        pass
+    return max_rss_kb()
+
+
+def timed_run(at, page, stats):
+    start = time.perf_counter()
+    at.run()
+    stats.record(page, time.perf_counter() - start, len(at.exception) > 0)
+    for exception in at.exception:
+        stats.fail(page, f"script raised: {exception.message}")
+    return at
+
+
+def widget(widgets, label):
+    for w in widgets:
+        if w.label == label:
+            return w
+    raise LookupError(f"No widget labelled {label!r}")
+
+
+def state_value(at, key, default=None):
+    try:
+        return at.session_state[key]
+    except KeyError:
+        return default
+
+
+# ---------- simulated sessions ----------
+
+def user_session(i, stats, analyses, timeout, rng):
+    from streamlit.testing.v1 import AppTest
+
+    email = f"loadtest{i}@example.com"
+    apps = []
+    step = "register"
+    try:
+        register = AppTest.from_file(page_path("register.py"), default_timeout=timeout)
+        timed_run(register, "register", stats)
+        widget(register.text_input, "Full Name").input(f"Load Test {i}")
+        widget(register.text_input, "Email Address").input(email)
+        widget(register.text_input, "Phone Number").input(f"+1999{i:07d}")
+        widget(register.text_input, "Password").input(PASSWORD)
+        widget(register.text_input, "Confirm Password").input(PASSWORD)
+        widget(register.button, "Create Account").click()
+        timed_run(register, "register", stats)
+        apps.append(register)
+
+        step = "login"
+        login = AppTest.from_file(page_path("login.py"), default_timeout=timeout)
+        timed_run(login, "login", stats)
+        widget(login.text_input, "Email Address").input(email)
+        widget(login.text_input, "Password").input(PASSWORD)
+        widget(login.button, "Sign In").click()
+        timed_run(login, "login", stats)
+        apps.append(login)
+        if not state_value(login, "logged_in"):
+            stats.fail(step, "not logged in after Sign In")
+            stats.journey(False)
+            return apps
+
+        # st.switch_page has no browser to follow here, so carry the session over
+        step = "dashboard:new_analysis"
+        dashboard = AppTest.from_file(page_path("dashboard.py"), default_timeout=timeout)
+        dashboard.session_state["logged_in"] = True
+        dashboard.session_state["user_email"] = email
+        dashboard.session_state["user_name"] = state_value(login, "user_name")
+        timed_run(dashboard, "dashboard:new_analysis", stats)
+        step = "dashboard:analyze"
+        for _ in range(analyses):
+            widget(dashboard.number_input, "Age").set_value(rng.randint(18, 80))
+            widget(dashboard.number_input, "Sleep Duration (hours)").set_value(round(rng.uniform(3.0, 10.0), 1))
+            widget(dashboard.number_input, "Stress Level (0-10)").set_value(rng.randint(0, 10))
+            widget(dashboard.selectbox, "Snoring").set_value(rng.choice(SNORING))
+            widget(dashboard.button, "🔍 Analyze & Predict").click()
+            timed_run(dashboard, "dashboard:analyze", stats)
+        step = "dashboard:history"
+        widget(dashboard.sidebar.radio, "Select Section").set_value("Analysis History")
+        timed_run(dashboard, "dashboard:history", stats)
+        apps.append(dashboard)
+        stats.journey(True)
+    except Exception as e:
+        stats.fail(step, f"{type(e).__name__}: {e}")
+        stats.journey(False)
+    return apps
+
+
+def admin_session(i, stats, timeout, rng):
+    from streamlit.testing.v1 import AppTest
+
+    apps = []
+    step = "admin:overview"
+    try:
+        admin = AppTest.from_file(page_path("admin_dashboard.py"), default_timeout=timeout)
+        admin.session_state["admin_logged_in"] = True
+        timed_run(admin, "admin:overview", stats)
+        step = "admin:search"
+        widget(admin.text_input, "Search by email or name").input(f"seed{rng.randint(0, 99)}")
+        timed_run(admin, "admin:search", stats)
+        step = "admin:filter"
+        for diagnosis in rng.sample(DIAGNOSES, len(DIAGNOSES)):
+            widget(admin.selectbox, "Select Diagnosis to View").set_value(diagnosis)
+            timed_run(admin, "admin:filter", stats)
+        apps.append(admin)
+        stats.journey(True)
+    except Exception as e:
+        stats.fail(step, f"{type(e).__name__}: {e}")
+        stats.journey(False)
+    return apps
+
+
+# ---------- driver ----------
+
+def run_load_test(args):
+    rng = random.Random(args.seed)
+    original_cwd = os.getcwd()
+    workdir = prepare_workspace(args.keep_data)
+    os.chdir(workdir)
+    try:
+        seed_start = time.perf_counter()
+        seed_data(args.users, args.records, rng)
+        seed_seconds = time.perf_counter() - seed_start
+
+        stats = LoadStats()
+        rss_before = current_rss_kb()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = []
+            for i in range(args.sessions):
+                futures.append(pool.submit(user_session, i, stats, args.analyses, args.timeout,
+                                           random.Random(rng.random())))
+            for i in range(args.admins):
+                futures.append(pool.submit(admin_session, i, stats, args.timeout,
+                                           random.Random(rng.random())))
+            # Keep every AppTest alive until the end so the RSS reading covers them all
+            apps = [f.result() for f in futures]
+        wall = time.perf_counter() - start
+        rss_after = current_rss_kb()
+        peak_rss = max_rss_kb()
+    finally:
+        os.chdir(original_cwd)
+        if not args.keep_data:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    total_sessions = max(1, args.sessions + args.admins)
+    total_runs = sum(len(v) for v in stats.latencies.values())
+    report = {
+        "config": {
+            "sessions": args.sessions,
+            "admins": args.admins,
+            "concurrency": args.concurrency,
+            "analyses_per_session": args.analyses,
+            "seed_users": args.users,
+            "seed_records": args.records
+        },
+        "seed_seconds": round(seed_seconds, 3),
+        "wall_seconds": round(wall, 3),
+        "reruns": total_runs,
+        "reruns_per_second": round(total_runs / wall, 2) if wall else 0.0,
+        "journeys": stats.journeys,
+        "failed_journeys": stats.failed_journeys,
+        "journeys_per_second": round(stats.journeys / wall, 2) if wall else 0.0,
+        "memory_per_session_kb": round((rss_after - rss_before) / total_sessions, 1),
+        "rss_kb": round(rss_after, 1),
+        "peak_rss_kb": round(peak_rss, 1),
+        "failures": dict(sorted(stats.failures.items(), key=lambda f: f[1], reverse=True)),
+        "pages": {}
+    }
+    for page, values in sorted(stats.latencies.items()):
+        values = sorted(values)
+        report["pages"][page] = {
+            "runs": len(values),
+            "errors": stats.errors[page],
+            "p50_ms": round(percentile(values, 50) * 1000, 1),
+            "p90_ms": round(percentile(values, 90) * 1000, 1),
+            "p95_ms": round(percentile(values, 95) * 1000, 1),
+            "p99_ms": round(percentile(values, 99) * 1000, 1),
+            "max_ms": round(values[-1] * 1000, 1)
+        }
+    del apps
+    return report
+
+
+def print_report(report):
+    print(f"Seeded {report['config']['seed_users']} users / {report['config']['seed_records']} records "
+          f"in {report['seed_seconds']}s")
+    print(f"{report['journeys']} journeys ({report['failed_journeys']} failed) in {report['wall_seconds']}s "
+          f"-> {report['journeys_per_second']} journeys/s, {report['reruns_per_second']} reruns/s")
+    print(f"Memory: ~{report['memory_per_session_kb']} KB per session, RSS {report['rss_kb']} KB "
+          f"(peak {report['peak_rss_kb']} KB)")
+    print()
+    print(f"{'page':<26}{'runs':>7}{'errors':>8}{'p50':>10}{'p90':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for page, row in report["pages"].items():
+        print(f"{page:<26}{row['runs']:>7}{row['errors']:>8}{row['p50_ms']:>10}{row['p90_ms']:>10}"
+              f"{row['p95_ms']:>10}{row['p99_ms']:>10}{row['max_ms']:>10}")
+    print("(latencies in ms)")
+    if report["failures"]:
+        print()
+        print("Failures:")
+        for reason, count in report["failures"].items():
+            print(f"{count:>7}  {reason}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless multi-session load test for the Streamlit pages")
+    parser.add_argument("--sessions", type=int, default=20, help="simulated patient sessions")
+    parser.add_argument("--admins", type=int, default=2, help="simulated admin sessions")
+    parser.add_argument("--concurrency", type=int, default=8, help="sessions running at the same time")
+    parser.add_argument("--analyses", type=int, default=3, help="analyses submitted per patient session")
+    parser.add_argument("--users", type=int, default=1000, help="synthetic users seeded before the run")
+    parser.add_argument("--records", type=int, default=10000, help="synthetic analysis records seeded before the run")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-rerun timeout in seconds")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for synthetic data")
+    parser.add_argument("--keep-data", metavar="DIR", help="seed and keep the data in DIR instead of a temp dir")
+    parser.add_argument("--json", metavar="FILE", help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = run_load_test(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 import streamlit as st
 import pandas as pd
 from pages.utils import load_analysis
+from services.search_index import load_search_index, search_users, records_for
+from services.cohort_cube import CUBE_DIMENSIONS, CUBE_MEASURES, dimension_values, query_cube
+from services.drift_stats import MIN_LIVE_SAMPLES, load_drift_stats, load_drift_baseline, set_drift_baseline, drift_report, histogram
 
 st.set_page_config(page_title="Admin Dashboard - Sleep Disorder Classification", layout="wide", initial_sidebar_state="collapsed")
 
@@ -101,7 +104,120 @@ else:
     st.dataframe(df, use_container_width=True, height=400)
     
     st.markdown("---")
-    
+
+    # Cohort breakdowns from the precomputed cube
+    st.markdown("### 📈 Cohort Breakdown")
+
+    dimension_labels = {
+        "diagnosis": "Diagnosis",
+        "age_band": "Age Band",
+        "gender": "Gender",
+        "smoking": "Smoking",
+        "alcohol": "Alcohol",
+        "snoring": "Snoring"
+    }
+    measure_labels = {
+        "age": "Age (years)",
+        "sleep_duration": "Sleep Duration (hrs)",
+        "stress_level": "Stress Level",
+        "systolic_bp": "Systolic BP (mmHg)",
+        "diastolic_bp": "Diastolic BP (mmHg)",
+        "bmi": "BMI"
+    }
+
+    col1, col2 = st.columns(2)
+    with col1:
+        group_by = st.multiselect(
+            "Break down by",
+            CUBE_DIMENSIONS,
+            default=["diagnosis", "age_band"],
+            format_func=lambda d: dimension_labels[d]
+        )
+    with col2:
+        chart_measure = st.selectbox(
+            "Chart measure",
+            CUBE_MEASURES,
+            index=CUBE_MEASURES.index("sleep_duration"),
+            format_func=lambda m: measure_labels[m]
+        )
+
+    cube_filters = {}
+    filter_cols = st.columns(len(CUBE_DIMENSIONS))
+    for col, dimension in zip(filter_cols, CUBE_DIMENSIONS):
+        with col:
+            choice = st.selectbox(
+                dimension_labels[dimension],
+                ["All"] + dimension_values(dimension),
+                key=f"cube_filter_{dimension}"
+            )
+            if choice != "All":
+                cube_filters[dimension] = choice
+
+    cube_rows = query_cube(group_by, cube_filters)
+
+    if not cube_rows:
+        st.info("No records match this cohort.")
+    else:
+        cube_df = pd.DataFrame(cube_rows)
+        if group_by:
+            cube_df["Cohort"] = cube_df[group_by].astype(str).agg(" / ".join, axis=1)
+            st.bar_chart(cube_df.set_index("Cohort")[f"mean_{chart_measure}"])
+        cube_df = cube_df.rename(columns={
+            **dimension_labels,
+            "count": "Records",
+            **{f"mean_{m}": f"Mean {label}" for m, label in measure_labels.items()}
+        })
+        st.dataframe(cube_df.round(2), use_container_width=True)
+
+    st.markdown("---")
+
+    # Feature drift: live model inputs against a frozen baseline
+    st.markdown("### 📡 Feature Drift")
+
+    drift_live = load_drift_stats()
+    drift_baseline = load_drift_baseline()
+
+    if drift_baseline is None:
+        st.info("No drift baseline yet. Freeze the current input distribution to start monitoring.")
+    else:
+        drift_rows = drift_report(drift_baseline, drift_live)
+        drifting = [r["feature"] for r in drift_rows if r["status"] in ("Moderate", "Significant")]
+        if drift_live["count"] < MIN_LIVE_SAMPLES:
+            st.info(f"ℹ️ Only {drift_live['count']} analyses since the baseline; "
+                    f"drift is checked from {MIN_LIVE_SAMPLES} onwards.")
+        elif drifting:
+            st.warning(f"⚠️ Drift detected in: {', '.join(drifting)}")
+        else:
+            st.success(f"✅ No drift across {drift_live['count']} analyses since the baseline")
+
+        drift_df = pd.DataFrame(drift_rows).rename(columns={
+            "feature": "Feature",
+            "baseline_n": "Baseline N",
+            "live_n": "Live N",
+            "baseline_mean": "Baseline Mean",
+            "live_mean": "Live Mean",
+            "baseline_std": "Baseline SD",
+            "live_std": "Live SD",
+            "mean_shift_sd": "Mean Shift (SD)",
+            "psi": "PSI",
+            "status": "Status"
+        })
+        st.dataframe(drift_df.round(3), use_container_width=True)
+
+        drift_feature = st.selectbox("Compare distribution", [r["feature"] for r in drift_rows])
+        drift_chart = pd.DataFrame({
+            "Baseline": dict(histogram(drift_baseline, drift_feature)),
+            "Live": dict(histogram(drift_live, drift_feature))
+        }).fillna(0)
+        st.bar_chart(drift_chart)
+
+    if st.button("📌 Set current distribution as baseline"):
+        # Live statistics restart from an empty window after this
+        set_drift_baseline()
+        st.rerun()
+
+    st.markdown("---")
+
     # Filter by diagnosis
     st.markdown("### 🔍 Filter by Diagnosis")
     
@@ -150,16 +266,45 @@ else:
 
 st.markdown("---")
 
+# Search patients by email or name
+st.markdown("### 🔎 Search Patients")
+
+search_query = st.text_input("Search by email or name", placeholder="e.g., john or john@example.com")
+
+if search_query:
+    search_index = load_search_index()
+    matched_emails = search_users(search_query)
+
+    if not matched_emails:
+        st.info(f"No patients found for '{search_query}'")
+    else:
+        st.dataframe(pd.DataFrame([{
+            "Name": search_index["users"].get(email, ""),
+            "Email": email,
+            "Analyses": len(records_for(email, analysis_history))
+        } for email in matched_emails]), use_container_width=True)
+
+        selected_email = st.selectbox("View records for", matched_emails)
+        selected_records = records_for(selected_email, analysis_history)
+
+        if selected_records:
+            st.dataframe(pd.DataFrame(selected_records), use_container_width=True)
+        else:
+            st.info("This patient has no analyses yet.")
+
+st.markdown("---")
+
 # Admin navigation
 col1, col2 = st.columns(2)
 
 with col1:
     st.markdown("### Statistics")
-    if analysis_history:
-        # Average metrics
-        avg_age = sum([a["age"] for a in analysis_history]) / len(analysis_history)
-        avg_stress = sum([a["stress_level"] for a in analysis_history]) / len(analysis_history)
-        avg_sleep = sum([a["sleep_duration"] for a in analysis_history]) / len(analysis_history)
+    totals = query_cube()
+    if totals:
+        # Average metrics, rolled up from the cohort cube
+        avg_age = totals[0]["mean_age"]
+        avg_stress = totals[0]["mean_stress_level"]
+        avg_sleep = totals[0]["mean_sleep_duration"]
         
         st.write(f"**Average Age:** {avg_age:.1f} years")
         st.write(f"**Average Stress Level:** {avg_stress:.1f}/10")
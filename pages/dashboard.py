@@ -1,7 +1,14 @@
 import streamlit as st
 import pandas as pd
 import json
-from pages.utils import load_analysis, save_analysis, load_models
+from pages.utils import (
+    load_analysis, save_analysis, load_models, load_candidate_model, candidate_model_version,
+    encode_features, append_shadow_result, DISORDERS
+)
+from services.search_index import index_analysis
+from services.cohort_cube import add_to_cube
+from services.drift_stats import update_drift_stats
+from services.user_trends import record_user_trend, load_user_trends, build_trends, trend_rows
 from datetime import datetime
 
 st.set_page_config(page_title="Dashboard - Sleep Disorder Classification", layout="wide", initial_sidebar_state="collapsed")
@@ -61,6 +68,11 @@ if "logged_in" not in st.session_state or not st.session_state.logged_in:
 st.title(f"📊 Welcome, {st.session_state.user_name}!")
 st.markdown("---")
 
+@st.cache_resource
+def load_cached_candidate_model(version):
+    # `version` is the candidate files' mtimes, so replacing them reloads once
+    return load_candidate_model()
+
 # Load models
 model, scaler, models_loaded = load_models()
 
@@ -107,19 +119,25 @@ if page_option == "New Analysis":
         bmi = st.number_input("BMI", min_value=10.0, max_value=50.0, value=25.0, step=0.1)
     
     if st.button("🔍 Analyze & Predict", use_container_width=True):
-        # Prepare features for prediction
-        gender_val = 1 if gender == "Male" else 0
-        alcohol_val = {"None": 0, "Light": 1, "Moderate": 2, "Heavy": 3}[alcohol]
-        smoking_val = {"Never": 0, "Former": 1, "Current": 2}[smoking]
-        snoring_val = 1 if snoring == "Yes" else 0
+        # Model inputs, keyed the same way as the saved analysis record
+        inputs = {
+            "age": age,
+            "gender": gender,
+            "sleep_duration": sleep_duration,
+            "stress_level": stress_level,
+            "systolic_bp": systolic_pressure,
+            "diastolic_bp": diastolic_pressure,
+            "heart_rate": heart_rate,
+            "daily_steps": daily_steps,
+            "caffeine_intake": caffeine_intake,
+            "alcohol": alcohol,
+            "smoking": smoking,
+            "snoring": snoring,
+            "bmi": bmi
+        }
         
         # Create feature array
-        features = [[
-            age, gender_val, sleep_duration, stress_level, 
-            systolic_pressure, diastolic_pressure, heart_rate, 
-            daily_steps, caffeine_intake, alcohol_val, 
-            smoking_val, snoring_val, bmi
-        ]]
+        features = encode_features([inputs])
         
         # Scale features
         features_scaled = scaler.transform(features)
@@ -128,38 +146,40 @@ if page_option == "New Analysis":
         prediction = model.predict(features_scaled)[0]
         
         # Map prediction to disorder name
-        disorders = {
-            0: "None",
-            1: "Insomnia",
-            2: "Sleep Apnea",
-            3: "Narcolepsy"
-        }
-        
-        disorder_name = disorders.get(int(prediction), "Unknown")
+        disorder_name = DISORDERS.get(int(prediction), "Unknown")
         
         # Save to analysis history
         analysis_record = {
             "email": st.session_state.user_email,
             "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "age": age,
-            "gender": gender,
-            "sleep_duration": sleep_duration,
-            "stress_level": stress_level,
-            "systolic_bp": systolic_pressure,
-            "diastolic_bp": diastolic_pressure,
-            "heart_rate": heart_rate,
-            "daily_steps": daily_steps,
-            "caffeine_intake": caffeine_intake,
-            "alcohol": alcohol,
-            "smoking": smoking,
-            "snoring": snoring,
-            "bmi": bmi,
+            **inputs,
             "diagnosis": disorder_name
         }
         
+        # Shadow mode: score the candidate model too, without showing it to the user
+        candidate_version = candidate_model_version()
+        candidate_loaded = False
+        if candidate_version is not None:
+            candidate_model, candidate_scaler, candidate_loaded = load_cached_candidate_model(candidate_version)
+        if candidate_loaded:
+            try:
+                candidate_prediction = candidate_model.predict(candidate_scaler.transform(features))[0]
+                append_shadow_result({
+                    "email": analysis_record["email"],
+                    "date": analysis_record["date"],
+                    "diagnosis": disorder_name,
+                    "candidate_diagnosis": DISORDERS.get(int(candidate_prediction), "Unknown")
+                })
+            except:
+                pass
+        
         analysis_history = load_analysis()
         analysis_history.append(analysis_record)
         save_analysis(analysis_history)
+        index_analysis(analysis_record, len(analysis_history) - 1)
+        add_to_cube(analysis_record)
+        update_drift_stats(analysis_record)
+        record_user_trend(analysis_record)
         
         # Display results
         st.markdown("---")
@@ -193,6 +213,37 @@ elif page_option == "Analysis History":
     if not user_analyses:
         st.info("No analyses yet. Go to 'New Analysis' to create your first analysis!")
     else:
+        trends = load_user_trends(st.session_state.user_email) or build_trends(user_analyses)
+        
+        st.markdown("#### 📈 Your Trends")
+        trend_view = st.radio("Trend View", ["Recent Analyses", "Daily", "Weekly"], horizontal=True)
+        
+        if trend_view == "Recent Analyses":
+            trend_df = pd.DataFrame(trends["recent"]).set_index("date")
+        else:
+            trend_df = pd.DataFrame(trend_rows(trends, trend_view.lower())).set_index("period")
+        trend_df = trend_df.rename(columns={
+            "sleep_duration": "Sleep Duration (hrs)",
+            "stress_level": "Stress Level",
+            "systolic_bp": "Systolic BP",
+            "diastolic_bp": "Diastolic BP"
+        })
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.line_chart(trend_df[["Sleep Duration (hrs)", "Stress Level"]])
+        with col2:
+            st.line_chart(trend_df[["Systolic BP", "Diastolic BP"]])
+        
+        if trends["transitions"]:
+            st.markdown("**Diagnosis changes**")
+            st.dataframe(pd.DataFrame(
+                sorted(trends["transitions"].items(), key=lambda t: t[1], reverse=True),
+                columns=["Change", "Times"]
+            ), use_container_width=True, hide_index=True)
+        
+        st.markdown("#### 🗂️ All Analyses")
+        
         # Sort by date (newest first)
         user_analyses.sort(key=lambda x: x["date"], reverse=True)
         
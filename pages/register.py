@@ -1,5 +1,6 @@
 import streamlit as st
 from pages.utils import load_users, save_users
+from services.search_index import index_user
 from werkzeug.security import generate_password_hash
 
 st.set_page_config(page_title="Register - Sleep Disorder Classification", layout="wide", initial_sidebar_state="collapsed")
@@ -79,6 +80,7 @@ with col2:
                     "password": hashed_password
                 }
                 save_users(users)
+                index_user(email, name)
                 st.success("✅ Registration successful! Please log in.")
                 st.balloons()
 
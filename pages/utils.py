@@ -2,11 +2,33 @@ import json
 import os
 from werkzeug.security import generate_password_hash, check_password_hash
 import joblib
+import pandas as pd
 
 USERS_FILE = "data/users.json"
 ANALYSIS_FILE = "data/analysis_history.json"
+SHADOW_LOG_FILE = "data/shadow_log.jsonl"
+MODEL_FILE = "ml/model.pkl"
+SCALER_FILE = "ml/scaler.pkl"
+CANDIDATE_MODEL_FILE = "ml/candidate_model.pkl"
+CANDIDATE_SCALER_FILE = "ml/candidate_scaler.pkl"
 ADMIN_PASSWORD = "admin123"
 
+# Model inputs, in the order the model was trained on
+FEATURE_COLUMNS = [
+    "age", "gender", "sleep_duration", "stress_level",
+    "systolic_bp", "diastolic_bp", "heart_rate",
+    "daily_steps", "caffeine_intake", "alcohol",
+    "smoking", "snoring", "bmi"
+]
+ALCOHOL_LEVELS = {"None": 0, "Light": 1, "Moderate": 2, "Heavy": 3}
+SMOKING_LEVELS = {"Never": 0, "Former": 1, "Current": 2}
+DISORDERS = {
+    0: "None",
+    1: "Insomnia",
+    2: "Sleep Apnea",
+    3: "Narcolepsy"
+}
+
 def load_users():
     if not os.path.exists(USERS_FILE):
         return {}
@@ -49,8 +71,62 @@ def save_analysis(data):
 
 def load_models():
     try:
-        model = joblib.load("ml/model.pkl")
-        scaler = joblib.load("ml/scaler.pkl")
+        model = joblib.load(MODEL_FILE)
+        scaler = joblib.load(SCALER_FILE)
         return model, scaler, True
     except:
         return None, None, False
+
+def candidate_scaler_file():
+    # Falls back to the production scaler when the candidate ships without one
+    return CANDIDATE_SCALER_FILE if os.path.exists(CANDIDATE_SCALER_FILE) else SCALER_FILE
+
+def candidate_model_version():
+    """Modification times of the candidate pickles, or None if there is no candidate."""
+    try:
+        return os.path.getmtime(CANDIDATE_MODEL_FILE), os.path.getmtime(candidate_scaler_file())
+    except OSError:
+        return None
+
+def load_candidate_model():
+    try:
+        model = joblib.load(CANDIDATE_MODEL_FILE)
+        scaler = joblib.load(candidate_scaler_file())
+        return model, scaler, True
+    except:
+        return None, None, False
+
+def encode_features(records):
+    """Turn analysis records into the model's numeric feature matrix.
+
+    Works on any number of records at once; unknown category values come
+    out as NaN.
+    """
+    df = pd.DataFrame.from_records(records, columns=FEATURE_COLUMNS)
+    df["gender"] = (df["gender"] == "Male").astype(int)
+    df["alcohol"] = df["alcohol"].map(ALCOHOL_LEVELS)
+    df["smoking"] = df["smoking"].map(SMOKING_LEVELS)
+    df["snoring"] = (df["snoring"] == "Yes").astype(int)
+    return df.to_numpy(dtype=float)
+
+def append_shadow_result(entry):
+    try:
+        os.makedirs("data", exist_ok=True)
+        with open(SHADOW_LOG_FILE, 'a') as f:
+            f.write(json.dumps(entry) + "\n")
+    except:
+        pass
+
+def load_shadow_log():
+    if not os.path.exists(SHADOW_LOG_FILE):
+        return []
+    entries = []
+    try:
+        with open(SHADOW_LOG_FILE, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entries.append(json.loads(line))
+    except:
+        pass
+    return entries
@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+
+from pages.utils import load_analysis
+
+COHORT_CUBE_FILE = "data/cohort_cube.json"
+
+CUBE_DIMENSIONS = ["diagnosis", "age_band", "gender", "smoking", "alcohol", "snoring"]
+CUBE_MEASURES = ["age", "sleep_duration", "stress_level", "systolic_bp", "diastolic_bp", "bmi"]
+
+AGE_BANDS = [
+    (0, 18, "<18"),
+    (18, 30, "18-29"),
+    (30, 40, "30-39"),
+    (40, 50, "40-49"),
+    (50, 60, "50-59"),
+    (60, 70, "60-69"),
+    (70, 200, "70+")
+]
+
+# The cube keeps one cell per combination of dimension values, holding a count
+# and a running sum per measure. Its size is bounded by the dimension
+# cardinalities, so every slice or roll-up costs the same however many
+# analyses have been saved.
+_lock = threading.RLock()
+_cache = {"mtime": None, "cube": None}
+
+
+def age_band(age):
+    for low, high, label in AGE_BANDS:
+        if low <= age < high:
+            return label
+    return AGE_BANDS[-1][2]
+
+
+def _cell_key(record):
+    values = {
+        "diagnosis": record.get("diagnosis", "Unknown"),
+        "age_band": age_band(record.get("age", 0)),
+        "gender": record.get("gender", "Unknown"),
+        "smoking": record.get("smoking", "Unknown"),
+        "alcohol": record.get("alcohol", "Unknown"),
+        "snoring": record.get("snoring", "Unknown")
+    }
+    return "|".join(str(values[d]) for d in CUBE_DIMENSIONS)
+
+
+def _add_record(cube, record):
+    cell = cube.setdefault(_cell_key(record), {"count": 0, "sums": {m: 0.0 for m in CUBE_MEASURES}})
+    cell["count"] += 1
+    for m in CUBE_MEASURES:
+        cell["sums"][m] += float(record.get(m, 0) or 0)
+
+
+def _file_mtime():
+    try:
+        return os.path.getmtime(COHORT_CUBE_FILE)
+    except OSError:
+        return None
+
+
+def _save(cube):
+    os.makedirs("data", exist_ok=True)
+    with open(COHORT_CUBE_FILE, 'w') as f:
+        json.dump(cube, f)
+    _cache["mtime"] = _file_mtime()
+    _cache["cube"] = cube
+
+
+def rebuild_cube():
+    cube = {}
+    for record in load_analysis():
+        _add_record(cube, record)
+    with _lock:
+        _save(cube)
+    return cube
+
+
+def _load_cube():
+    # Also reports whether the cube had to be rebuilt from the history
+    mtime = _file_mtime()
+    if mtime is None:
+        return rebuild_cube(), True
+    if _cache["cube"] is not None and _cache["mtime"] == mtime:
+        return _cache["cube"], False
+    try:
+        with open(COHORT_CUBE_FILE, 'r') as f:
+            cube = json.load(f)
+    except:
+        return rebuild_cube(), True
+    _cache["mtime"] = mtime
+    _cache["cube"] = cube
+    return cube, False
+
+
+def load_cube():
+    return _load_cube()[0]
+
+
+def add_to_cube(record):
+    """Fold a record that has already been saved to the history into the cube."""
+    with _lock:
+        cube, rebuilt = _load_cube()
+        # A rebuild replays the saved history, which already holds `record`
+        if rebuilt:
+            return
+        _add_record(cube, record)
+        _save(cube)
+
+
+def dimension_values(dimension):
+    """Every value of `dimension` present in the cube, sorted."""
+    position = CUBE_DIMENSIONS.index(dimension)
+    values = {key.split("|")[position] for key in load_cube()}
+    if dimension == "age_band":
+        order = [label for _, _, label in AGE_BANDS]
+        return [v for v in order if v in values]
+    return sorted(values)
+
+
+def query_cube(group_by=(), filters=None):
+    """Slice the cube on `filters` and roll it up to the `group_by` dimensions.
+
+    `filters` maps a dimension to the value (or list of values) to keep.
+    Returns one row per group with the record count and the mean of every
+    measure, largest groups first.
+    """
+    filters = {d: v if isinstance(v, (list, tuple, set)) else [v] for d, v in (filters or {}).items()}
+    positions = [CUBE_DIMENSIONS.index(d) for d in group_by]
+    filter_positions = [(CUBE_DIMENSIONS.index(d), set(map(str, v))) for d, v in filters.items()]
+
+    groups = {}
+    for key, cell in load_cube().items():
+        values = key.split("|")
+        if any(values[p] not in allowed for p, allowed in filter_positions):
+            continue
+        group_key = tuple(values[p] for p in positions)
+        group = groups.setdefault(group_key, {"count": 0, "sums": {m: 0.0 for m in CUBE_MEASURES}})
+        group["count"] += cell["count"]
+        for m in CUBE_MEASURES:
+            group["sums"][m] += cell["sums"][m]
+
+    rows = []
+    for group_key, group in groups.items():
+        if not group["count"]:
+            continue
+        row = dict(zip(group_by, group_key))
+        row["count"] = group["count"]
+        for m in CUBE_MEASURES:
+            row[f"mean_{m}"] = group["sums"][m] / group["count"]
+        rows.append(row)
+    rows.sort(key=lambda r: r["count"], reverse=True)
+    return rows
@@ -0,0 +1,240 @@
+import json
+import math
+import os
+import threading
+
+from pages.utils import load_analysis
+
+DRIFT_STATS_FILE = "data/drift_stats.json"
+DRIFT_BASELINE_FILE = "data/drift_baseline.json"
+
+# (low, high, bins) for each numeric model input; values outside the range
+# land in the first or last bin
+NUMERIC_BINS = {
+    "age": (0, 120, 12),
+    "sleep_duration": (0, 12, 12),
+    "stress_level": (0, 11, 11),
+    "systolic_bp": (80, 200, 12),
+    "diastolic_bp": (50, 130, 8),
+    "heart_rate": (30, 200, 17),
+    "daily_steps": (0, 30000, 15),
+    "caffeine_intake": (0, 1000, 10),
+    "bmi": (10, 50, 8)
+}
+CATEGORICAL_FEATURES = ["gender", "alcohol", "smoking", "snoring"]
+
+# PSI above these is conventionally read as moderate / significant drift
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.2
+
+# PSI over a handful of live records is just noise, so don't flag below this
+MIN_LIVE_SAMPLES = 100
+
+_lock = threading.RLock()
+_cache = {"mtime": None, "stats": None}
+
+
+def _empty_stats():
+    return {
+        "count": 0,
+        "numeric": {
+            f: {"n": 0, "mean": 0.0, "m2": 0.0, "min": None, "max": None, "bins": [0] * bins}
+            for f, (_, _, bins) in NUMERIC_BINS.items()
+        },
+        "categorical": {f: {} for f in CATEGORICAL_FEATURES}
+    }
+
+
+def _bin_index(feature, value):
+    low, high, bins = NUMERIC_BINS[feature]
+    index = int((value - low) / (high - low) * bins)
+    return min(max(index, 0), bins - 1)
+
+
+def _update(stats, record):
+    # Welford's online update keeps mean and variance exact in O(1)
+    stats["count"] += 1
+    for feature in NUMERIC_BINS:
+        value = record.get(feature)
+        if value is None:
+            continue
+        value = float(value)
+        s = stats["numeric"][feature]
+        s["n"] += 1
+        delta = value - s["mean"]
+        s["mean"] += delta / s["n"]
+        s["m2"] += delta * (value - s["mean"])
+        s["min"] = value if s["min"] is None else min(s["min"], value)
+        s["max"] = value if s["max"] is None else max(s["max"], value)
+        s["bins"][_bin_index(feature, value)] += 1
+    for feature in CATEGORICAL_FEATURES:
+        value = record.get(feature)
+        if value is None:
+            continue
+        counts = stats["categorical"][feature]
+        counts[str(value)] = counts.get(str(value), 0) + 1
+
+
+def _file_mtime():
+    try:
+        return os.path.getmtime(DRIFT_STATS_FILE)
+    except OSError:
+        return None
+
+
+def _save(stats):
+    os.makedirs("data", exist_ok=True)
+    with open(DRIFT_STATS_FILE, 'w') as f:
+        json.dump(stats, f)
+    _cache["mtime"] = _file_mtime()
+    _cache["stats"] = stats
+
+
+def rebuild_drift_stats():
+    stats = _empty_stats()
+    for record in load_analysis():
+        _update(stats, record)
+    with _lock:
+        _save(stats)
+    return stats
+
+
+def _recover_drift_stats():
+    # Once a baseline exists the live window only covers later analyses, so
+    # replaying the whole history would smuggle pre-baseline data back in
+    if os.path.exists(DRIFT_BASELINE_FILE):
+        stats = _empty_stats()
+        with _lock:
+            _save(stats)
+        return stats, False
+    return rebuild_drift_stats(), True
+
+
+def _load_drift_stats():
+    # Also reports whether the stats had to be rebuilt from the history
+    mtime = _file_mtime()
+    if mtime is None:
+        return _recover_drift_stats()
+    if _cache["stats"] is not None and _cache["mtime"] == mtime:
+        return _cache["stats"], False
+    try:
+        with open(DRIFT_STATS_FILE, 'r') as f:
+            stats = json.load(f)
+    except:
+        return _recover_drift_stats()
+    _cache["mtime"] = mtime
+    _cache["stats"] = stats
+    return stats, False
+
+
+def load_drift_stats():
+    return _load_drift_stats()[0]
+
+
+def update_drift_stats(record):
+    """Fold a record that has already been saved to the history into the live stats."""
+    with _lock:
+        stats, rebuilt = _load_drift_stats()
+        # A rebuild replays the saved history, which already holds `record`
+        if rebuilt:
+            return
+        _update(stats, record)
+        _save(stats)
+
+
+def load_drift_baseline():
+    if not os.path.exists(DRIFT_BASELINE_FILE):
+        return None
+    try:
+        with open(DRIFT_BASELINE_FILE, 'r') as f:
+            return json.load(f)
+    except:
+        return None
+
+
+def set_drift_baseline():
+    """Freeze the current statistics as the baseline and start a fresh live window."""
+    with _lock:
+        stats = load_drift_stats()
+        os.makedirs("data", exist_ok=True)
+        with open(DRIFT_BASELINE_FILE, 'w') as f:
+            json.dump(stats, f)
+        _save(_empty_stats())
+
+
+def std_dev(s):
+    return math.sqrt(s["m2"] / (s["n"] - 1)) if s["n"] > 1 else 0.0
+
+
+def _proportions(counts, keys):
+    total = sum(counts.get(k, 0) for k in keys)
+    return [counts.get(k, 0) / total if total else 0.0 for k in keys]
+
+
+def psi(expected, actual, eps=1e-4):
+    """Population stability index between two lists of proportions."""
+    value = 0.0
+    for e, a in zip(expected, actual):
+        e = max(e, eps)
+        a = max(a, eps)
+        value += (a - e) * math.log(a / e)
+    return value
+
+
+def drift_status(value, live_n):
+    if live_n < MIN_LIVE_SAMPLES:
+        return "Insufficient data"
+    if value >= PSI_SIGNIFICANT:
+        return "Significant"
+    if value >= PSI_MODERATE:
+        return "Moderate"
+    return "Stable"
+
+
+def drift_report(baseline, live):
+    """One row per model input comparing the live window against the baseline."""
+    rows = []
+    for feature in NUMERIC_BINS:
+        b = baseline["numeric"][feature]
+        l = live["numeric"][feature]
+        keys = list(range(len(b["bins"])))
+        value = psi(_proportions(dict(enumerate(b["bins"])), keys), _proportions(dict(enumerate(l["bins"])), keys))
+        baseline_std = std_dev(b)
+        rows.append({
+            "feature": feature,
+            "baseline_n": b["n"],
+            "live_n": l["n"],
+            "baseline_mean": b["mean"],
+            "live_mean": l["mean"],
+            "baseline_std": baseline_std,
+            "live_std": std_dev(l),
+            "mean_shift_sd": (l["mean"] - b["mean"]) / baseline_std if baseline_std and l["n"] else 0.0,
+            "psi": value if l["n"] and b["n"] else 0.0
+        })
+    for feature in CATEGORICAL_FEATURES:
+        b = baseline["categorical"][feature]
+        l = live["categorical"][feature]
+        keys = sorted(set(b) | set(l))
+        value = psi(_proportions(b, keys), _proportions(l, keys))
+        rows.append({
+            "feature": feature,
+            "baseline_n": sum(b.values()),
+            "live_n": sum(l.values()),
+            "psi": value if b and l else 0.0
+        })
+    for row in rows:
+        row["status"] = drift_status(row["psi"], row["live_n"])
+    return rows
+
+
+def histogram(stats, feature):
+    """(label, proportion) pairs for one feature's bins or categories."""
+    if feature in NUMERIC_BINS:
+        low, high, bins = NUMERIC_BINS[feature]
+        width = (high - low) / bins
+        labels = [f"{low + i * width:g}-{low + (i + 1) * width:g}" for i in range(bins)]
+        counts = stats["numeric"][feature]["bins"]
+        return list(zip(labels, _proportions(dict(enumerate(counts)), list(range(bins)))))
+    counts = stats["categorical"][feature]
+    keys = sorted(counts)
+    return list(zip(keys, _proportions(counts, keys)))
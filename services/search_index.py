@@ -0,0 +1,259 @@
+import gc
+import json
+import os
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from pages.utils import load_users, load_analysis
+
+SEARCH_INDEX_FILE = "data/search_index.jsonl"
+
+# On disk the index is an append-only log with one line per registered user
+# or saved analysis position, so an update costs one short append. The prefix
+# and trigram lookups live in memory and each process replays only the lines
+# added since it last looked.
+_lock = threading.RLock()
+_cache = {"state": None, "index": None}
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _terms(email, name):
+    email = email.lower()
+    name = (name or "").lower()
+    terms = {email, email.split("@")[0]}
+    if name:
+        terms.add(name)
+        terms.update(name.split())
+    return terms
+
+
+def _searchable(email, name):
+    return f"{email} {name or ''}".lower()
+
+
+def _new_index(users, records):
+    # Bulk version of _add_user: collect postings in lists, turn them into sets
+    # in one pass and sort the terms once, which keeps a cold build fast.
+    # The build allocates millions of small objects that all stay alive, so
+    # the cyclic GC would only rescan them over and over.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        terms = defaultdict(list)
+        trigrams = defaultdict(list)
+        for email, name in users.items():
+            for term in _terms(email, name):
+                terms[term].append(email)
+            for gram in _trigrams(_searchable(email, name)):
+                trigrams[gram].append(email)
+        return {
+            "users": users,
+            "records": records,
+            "terms": {term: set(emails) for term, emails in terms.items()},
+            "sorted_terms": sorted(terms),
+            "trigrams": {gram: set(emails) for gram, emails in trigrams.items()}
+        }
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _add_user(index, email, name):
+    index["users"][email] = name
+    for term in _terms(email, name):
+        if term not in index["terms"]:
+            index["terms"][term] = set()
+            if index["sorted_terms"] is not None:
+                insort(index["sorted_terms"], term)
+        index["terms"][term].add(email)
+    for gram in _trigrams(_searchable(email, name)):
+        index["trigrams"].setdefault(gram, set()).add(email)
+
+
+def _file_state():
+    # (inode, size): a rebuild replaces the file, so a new inode means re-read it all
+    try:
+        st = os.stat(SEARCH_INDEX_FILE)
+        return st.st_ino, st.st_size
+    except OSError:
+        return None
+
+
+def _apply(index, entry):
+    if "user" in entry:
+        _add_user(index, entry["user"], entry.get("name", ""))
+    elif "record" in entry:
+        email = entry["record"]
+        if email not in index["users"]:
+            _add_user(index, email, "")
+        positions = index["records"].setdefault(email, [])
+        if not positions or positions[-1] != entry["position"]:
+            positions.append(entry["position"])
+
+
+def _read_log(offset):
+    """Entries from complete lines after byte `offset`, and the offset reached."""
+    with open(SEARCH_INDEX_FILE, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    # A line still being written by another process is picked up next time
+    end = data.rfind(b"\n") + 1
+    entries = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+    return entries, offset + end
+
+
+def rebuild_search_index():
+    users = {email: user.get("name", "") for email, user in load_users().items()}
+    records = {}
+    for position, record in enumerate(load_analysis()):
+        email = record.get("email")
+        if not email:
+            continue
+        records.setdefault(email, []).append(position)
+        if email not in users:
+            users[email] = ""
+    with _lock:
+        os.makedirs("data", exist_ok=True)
+        tmp_file = SEARCH_INDEX_FILE + ".tmp"
+        with open(tmp_file, 'w') as f:
+            for email, name in users.items():
+                f.write(json.dumps({"user": email, "name": name}) + "\n")
+            for email, positions in records.items():
+                for position in positions:
+                    f.write(json.dumps({"record": email, "position": position}) + "\n")
+        os.replace(tmp_file, SEARCH_INDEX_FILE)
+        index = _new_index(users, records)
+        _cache["state"] = _file_state()
+        _cache["index"] = index
+    return index
+
+
+def _load_search_index():
+    # Also reports whether the index had to be rebuilt from users and history
+    with _lock:
+        state = _file_state()
+        if state is None:
+            return rebuild_search_index(), True
+        cached = _cache["state"]
+        index = _cache["index"]
+        if index is not None and cached == state:
+            return index, False
+        try:
+            if index is not None and cached[0] == state[0] and state[1] > cached[1]:
+                # Same file, grown: replay only the new lines
+                entries, offset = _read_log(cached[1])
+                for entry in entries:
+                    _apply(index, entry)
+            else:
+                entries, offset = _read_log(0)
+                users, records = {}, {}
+                for entry in entries:
+                    if "user" in entry:
+                        users[entry["user"]] = entry.get("name", "")
+                    elif "record" in entry:
+                        users.setdefault(entry["record"], "")
+                        positions = records.setdefault(entry["record"], [])
+                        if not positions or positions[-1] != entry["position"]:
+                            positions.append(entry["position"])
+                index = _new_index(users, records)
+        except:
+            return rebuild_search_index(), True
+        _cache["state"] = (state[0], offset)
+        _cache["index"] = index
+        return index, False
+
+
+def load_search_index():
+    return _load_search_index()[0]
+
+
+def _append(entry):
+    # One short append per update; the following load replays it into memory
+    with open(SEARCH_INDEX_FILE, 'a') as f:
+        f.write(json.dumps(entry) + "\n")
+    _load_search_index()
+
+
+def index_user(email, name):
+    with _lock:
+        index, rebuilt = _load_search_index()
+        # A rebuild reads users.json, which already holds the new user
+        if rebuilt:
+            return
+        _append({"user": email, "name": name})
+
+
+def index_analysis(record, position):
+    """Record that analysis_history[position] belongs to record["email"]."""
+    with _lock:
+        index, rebuilt = _load_search_index()
+        # A rebuild replays the saved history, which already holds `position`
+        if rebuilt:
+            return
+        _append({"record": record["email"], "position": position})
+
+
+def search_users(query, limit=50):
+    """Return up to `limit` emails matching `query`.
+
+    Prefix matches on the email, its local part or any name word come first,
+    followed by substring matches found through the trigram index.
+    """
+    q = query.strip().lower()
+    if not q:
+        return []
+    # Writers mutate the posting sets in place, so search under the same lock
+    with _lock:
+        index = load_search_index()
+        matches = []
+        seen = set()
+
+        sorted_terms = index["sorted_terms"]
+        i = bisect_left(sorted_terms, q)
+        while i < len(sorted_terms) and sorted_terms[i].startswith(q) and len(matches) < limit:
+            for email in index["terms"][sorted_terms[i]]:
+                if len(matches) >= limit:
+                    break
+                if email not in seen:
+                    seen.add(email)
+                    matches.append(email)
+            i += 1
+
+        if len(q) >= 3 and len(matches) < limit:
+            # Walk the rarest trigram's posting list and stop as soon as we have enough
+            postings = sorted((index["trigrams"].get(gram, set()) for gram in _trigrams(q)), key=len)
+            users = index["users"]
+            for email in postings[0]:
+                if len(matches) >= limit:
+                    break
+                if email in seen or not all(email in posting for posting in postings[1:]):
+                    continue
+                if q in _searchable(email, users.get(email)):
+                    seen.add(email)
+                    matches.append(email)
+
+        return matches[:limit]
+
+
+def user_records(email):
+    """Positions in the analysis history of every record saved by `email`."""
+    with _lock:
+        return list(load_search_index()["records"].get(email, []))
+
+
+def records_for(email, history):
+    """Every record in `history` saved by `email`, newest first.
+
+    Index positions are only trusted when each one still points at a record
+    of this user; otherwise the index is stale and we fall back to a scan.
+    """
+    positions = sorted(set(user_records(email)), reverse=True)
+    records = [history[i] for i in positions if i < len(history) and history[i].get("email") == email]
+    if len(records) != len(positions):
+        records = [a for a in history if a.get("email") == email]
+        records.sort(key=lambda x: x["date"], reverse=True)
+    return records
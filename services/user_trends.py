@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+from pages.utils import load_analysis
+
+# One small file per user, so saving an analysis never rewrites users.json
+TRENDS_DIR = "data/trends"
+
+TREND_MEASURES = ["sleep_duration", "stress_level", "systolic_bp", "diastolic_bp"]
+
+# Rollups are capped so each user's file stays small however many analyses
+# they run
+DAILY_BUCKETS = 90
+WEEKLY_BUCKETS = 52
+RECENT_RECORDS = 30
+
+_lock = threading.RLock()
+
+
+def _empty_trends():
+    return {
+        "count": 0,
+        "daily": {},
+        "weekly": {},
+        "recent": [],
+        "transitions": {},
+        "last_diagnosis": None
+    }
+
+
+def _add_to_bucket(buckets, key, record, keep):
+    bucket = buckets.setdefault(key, {"count": 0, "sums": {m: 0.0 for m in TREND_MEASURES}})
+    bucket["count"] += 1
+    for m in TREND_MEASURES:
+        bucket["sums"][m] += float(record.get(m, 0) or 0)
+    if len(buckets) > keep:
+        for old_key in sorted(buckets)[:len(buckets) - keep]:
+            del buckets[old_key]
+
+
+def add_to_trends(trends, record):
+    """Fold one analysis record into a user's trend rollups."""
+    when = datetime.strptime(record["date"], "%Y-%m-%d %H:%M:%S")
+    trends["count"] += 1
+    _add_to_bucket(trends["daily"], when.strftime("%Y-%m-%d"), record, DAILY_BUCKETS)
+    _add_to_bucket(trends["weekly"], when.strftime("%G-W%V"), record, WEEKLY_BUCKETS)
+
+    trends["recent"].append({"date": record["date"], "diagnosis": record["diagnosis"],
+                             **{m: record.get(m) for m in TREND_MEASURES}})
+    del trends["recent"][:-RECENT_RECORDS]
+
+    previous = trends["last_diagnosis"]
+    if previous is not None and previous != record["diagnosis"]:
+        transition = f"{previous} → {record['diagnosis']}"
+        trends["transitions"][transition] = trends["transitions"].get(transition, 0) + 1
+    trends["last_diagnosis"] = record["diagnosis"]
+    return trends
+
+
+def build_trends(records):
+    trends = _empty_trends()
+    for record in sorted(records, key=lambda x: x["date"]):
+        add_to_trends(trends, record)
+    return trends
+
+
+def _trends_file(email):
+    # Hash the exact email (accounts are case-sensitive) so it is safe to use as a file name
+    return os.path.join(TRENDS_DIR, hashlib.sha1(email.encode("utf-8")).hexdigest() + ".json")
+
+
+def _save_trends(email, trends):
+    os.makedirs(TRENDS_DIR, exist_ok=True)
+    with open(_trends_file(email), 'w') as f:
+        json.dump({"email": email, "trends": trends}, f)
+
+
+def load_user_trends(email):
+    path = _trends_file(email)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except:
+        return None
+    # Never hand one account another account's rollups
+    if data.get("email") != email:
+        return None
+    return data.get("trends")
+
+
+def record_user_trend(record):
+    """Update the saving user's rollups.
+
+    Users without rollups yet are backfilled from their history the first
+    time, which already includes `record`.
+    """
+    email = record["email"]
+    with _lock:
+        trends = load_user_trends(email)
+        if trends is not None:
+            add_to_trends(trends, record)
+        else:
+            trends = build_trends([a for a in load_analysis() if a.get("email") == email])
+        _save_trends(email, trends)
+
+
+def rebuild_user_trends():
+    """Recompute every user's rollups from the full analysis history."""
+    by_email = {}
+    for record in load_analysis():
+        if record.get("email"):
+            by_email.setdefault(record["email"], []).append(record)
+    with _lock:
+        for email, records in by_email.items():
+            _save_trends(email, build_trends(records))
+
+
+def trend_rows(trends, period):
+    """Mean of each measure per "daily" or "weekly" bucket, oldest first."""
+    rows = []
+    for key in sorted(trends[period]):
+        bucket = trends[period][key]
+        row = {"period": key, "count": bucket["count"]}
+        for m in TREND_MEASURES:
+            row[m] = bucket["sums"][m] / bucket["count"]
+        rows.append(row)
+    return rows
@@ -0,0 +1,105 @@
+import pytest
+
+from pages.utils import save_analysis
+from services import cohort_cube
+from services.cohort_cube import age_band, rebuild_cube, add_to_cube, dimension_values, query_cube
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(workdir, monkeypatch):
+    monkeypatch.setattr(cohort_cube, "_cache", {"mtime": None, "cube": None})
+
+
+def _record(diagnosis, age, gender, sleep_duration, stress_level=5):
+    return {
+        "email": "a@example.com", "date": "2026-01-01 09:00:00",
+        "diagnosis": diagnosis, "age": age, "gender": gender,
+        "smoking": "Never", "alcohol": "None", "snoring": "No",
+        "sleep_duration": sleep_duration, "stress_level": stress_level,
+        "systolic_bp": 120, "diastolic_bp": 80, "bmi": 24.0
+    }
+
+
+HISTORY = [
+    _record("Insomnia", 25, "Male", 5.0),
+    _record("Insomnia", 27, "Female", 6.0),
+    _record("Insomnia", 45, "Female", 4.0),
+    _record("None", 35, "Male", 8.0),
+    _record("Sleep Apnea", 55, "Male", 6.5)
+]
+
+
+@pytest.fixture
+def cube():
+    save_analysis(HISTORY)
+    return rebuild_cube()
+
+
+def _by(rows, *dims):
+    return {tuple(r[d] for d in dims): r for r in rows}
+
+
+def test_age_band_edges():
+    assert age_band(17) == "<18"
+    assert age_band(18) == "18-29"
+    assert age_band(69) == "60-69"
+    assert age_band(70) == "70+"
+
+
+def test_roll_up_to_everything(cube):
+    rows = query_cube()
+    assert len(rows) == 1
+    assert rows[0]["count"] == len(HISTORY)
+    assert rows[0]["mean_sleep_duration"] == pytest.approx(sum(r["sleep_duration"] for r in HISTORY) / len(HISTORY))
+
+
+def test_roll_up_by_one_dimension_sorted_by_count(cube):
+    rows = query_cube(["diagnosis"])
+    assert rows[0]["diagnosis"] == "Insomnia"
+    insomnia = _by(rows, "diagnosis")[("Insomnia",)]
+    assert insomnia["count"] == 3
+    assert insomnia["mean_sleep_duration"] == pytest.approx(5.0)
+    assert insomnia["mean_age"] == pytest.approx((25 + 27 + 45) / 3)
+
+
+def test_roll_up_by_two_dimensions(cube):
+    rows = _by(query_cube(["diagnosis", "age_band"]), "diagnosis", "age_band")
+    assert rows[("Insomnia", "18-29")]["count"] == 2
+    assert rows[("Insomnia", "40-49")]["count"] == 1
+    assert rows[("Insomnia", "18-29")]["mean_sleep_duration"] == pytest.approx(5.5)
+
+
+def test_slice_with_single_value_and_list(cube):
+    rows = query_cube(["diagnosis"], {"gender": "Female"})
+    assert [(r["diagnosis"], r["count"]) for r in rows] == [("Insomnia", 2)]
+
+    rows = _by(query_cube(["gender"], {"diagnosis": ["None", "Sleep Apnea"]}), "gender")
+    assert list(rows) == [("Male",)]
+    assert rows[("Male",)]["count"] == 2
+    assert rows[("Male",)]["mean_sleep_duration"] == pytest.approx(7.25)
+
+
+def test_slice_with_no_matches(cube):
+    assert query_cube(["diagnosis"], {"gender": "Other"}) == []
+
+
+def test_add_to_cube_folds_in_a_saved_record(cube):
+    record = _record("Narcolepsy", 62, "Female", 9.0)
+    save_analysis(HISTORY + [record])
+    add_to_cube(record)
+
+    assert query_cube()[0]["count"] == len(HISTORY) + 1
+    assert "Narcolepsy" in dimension_values("diagnosis")
+
+
+def test_missing_cube_is_rebuilt_without_double_counting():
+    record = _record("Narcolepsy", 62, "Female", 9.0)
+    save_analysis(HISTORY + [record])
+    # No cube file yet: the rebuild already includes the record
+    add_to_cube(record)
+
+    assert query_cube()[0]["count"] == len(HISTORY) + 1
+
+
+def test_age_band_values_follow_band_order(cube):
+    assert dimension_values("age_band") == ["18-29", "30-39", "40-49", "50-59"]
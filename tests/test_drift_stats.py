@@ -0,0 +1,112 @@
+import math
+import random
+import statistics
+
+import pytest
+
+from pages.utils import save_analysis
+from services import drift_stats
+from services.drift_stats import (
+    MIN_LIVE_SAMPLES, PSI_MODERATE, PSI_SIGNIFICANT, rebuild_drift_stats, update_drift_stats,
+    load_drift_stats, load_drift_baseline, set_drift_baseline, std_dev, psi, drift_status, drift_report
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(workdir, monkeypatch):
+    monkeypatch.setattr(drift_stats, "_cache", {"mtime": None, "stats": None})
+
+
+def _records(n, rng, sleep_mean=7.0, gender_female=0.5):
+    return [{
+        "age": rng.randint(18, 80),
+        "sleep_duration": rng.gauss(sleep_mean, 1.0),
+        "stress_level": rng.randint(1, 10),
+        "bmi": rng.uniform(18, 35),
+        "gender": "Female" if rng.random() < gender_female else "Male",
+        "smoking": rng.choice(["Never", "Former", "Current"])
+    } for _ in range(n)]
+
+
+def test_welford_matches_two_pass_mean_and_variance():
+    records = _records(500, random.Random(1))
+    save_analysis(records)
+    stats = rebuild_drift_stats()
+
+    for feature in ("age", "sleep_duration", "bmi"):
+        values = [r[feature] for r in records]
+        s = stats["numeric"][feature]
+        assert s["n"] == len(values)
+        assert s["mean"] == pytest.approx(statistics.mean(values))
+        assert std_dev(s) == pytest.approx(statistics.stdev(values))
+        assert (s["min"], s["max"]) == (min(values), max(values))
+        assert sum(s["bins"]) == len(values)
+
+
+def test_missing_features_are_not_counted():
+    save_analysis([{"age": 40}, {"age": 50, "sleep_duration": 6.0}])
+    stats = rebuild_drift_stats()
+
+    assert stats["count"] == 2
+    assert stats["numeric"]["age"]["n"] == 2
+    assert stats["numeric"]["sleep_duration"]["n"] == 1
+    assert std_dev(stats["numeric"]["sleep_duration"]) == 0.0
+
+
+def test_out_of_range_values_land_in_the_edge_bins():
+    save_analysis([{"sleep_duration": -3.0}, {"sleep_duration": 30.0}])
+    bins = rebuild_drift_stats()["numeric"]["sleep_duration"]["bins"]
+
+    assert bins[0] == 1
+    assert bins[-1] == 1
+
+
+def test_psi_values():
+    assert psi([0.25, 0.25, 0.5], [0.25, 0.25, 0.5]) == pytest.approx(0.0)
+    expected = (0.7 - 0.5) * math.log(0.7 / 0.5) + (0.3 - 0.5) * math.log(0.3 / 0.5)
+    assert psi([0.5, 0.5], [0.7, 0.3]) == pytest.approx(expected)
+    # Empty bins are floored rather than blowing up the log
+    assert math.isfinite(psi([1.0, 0.0], [0.0, 1.0]))
+
+
+def test_drift_status_thresholds():
+    assert drift_status(0.0, MIN_LIVE_SAMPLES) == "Stable"
+    assert drift_status(PSI_MODERATE, MIN_LIVE_SAMPLES) == "Moderate"
+    assert drift_status(PSI_SIGNIFICANT, MIN_LIVE_SAMPLES) == "Significant"
+    assert drift_status(5.0, MIN_LIVE_SAMPLES - 1) == "Insufficient data"
+
+
+def test_report_flags_a_shifted_feature_only():
+    rng = random.Random(2)
+    save_analysis(_records(2000, rng))
+    rebuild_drift_stats()
+    set_drift_baseline()
+    for record in _records(1000, rng, sleep_mean=5.0):
+        update_drift_stats(record)
+
+    rows = {r["feature"]: r for r in drift_report(load_drift_baseline(), load_drift_stats())}
+    assert rows["sleep_duration"]["status"] == "Significant"
+    assert rows["sleep_duration"]["mean_shift_sd"] == pytest.approx(-2.0, abs=0.2)
+    assert rows["age"]["status"] == "Stable"
+    assert rows["gender"]["status"] == "Stable"
+
+
+def test_small_live_window_is_not_flagged():
+    rng = random.Random(3)
+    save_analysis(_records(2000, rng))
+    rebuild_drift_stats()
+    set_drift_baseline()
+    for record in _records(10, rng, sleep_mean=3.0, gender_female=1.0):
+        update_drift_stats(record)
+
+    statuses = {r["status"] for r in drift_report(load_drift_baseline(), load_drift_stats())}
+    assert statuses == {"Insufficient data"}
+
+
+def test_setting_a_baseline_starts_an_empty_live_window():
+    save_analysis(_records(50, random.Random(4)))
+    rebuild_drift_stats()
+    set_drift_baseline()
+
+    assert load_drift_baseline()["count"] == 50
+    assert load_drift_stats()["count"] == 0
@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+from pages.utils import save_users, save_analysis
+from services import search_index
+from services.search_index import (
+    SEARCH_INDEX_FILE, rebuild_search_index, index_user, index_analysis,
+    search_users, records_for
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(workdir, monkeypatch):
+    monkeypatch.setattr(search_index, "_cache", {"state": None, "index": None})
+
+
+def _users(*pairs):
+    return {email: {"name": name, "password": "x"} for email, name in pairs}
+
+
+def _record(email, date="2026-01-01 09:00:00"):
+    return {"email": email, "date": date, "diagnosis": "None"}
+
+
+def test_prefix_matches_email_local_part_and_name_words():
+    save_users(_users(("john.smith@example.com", "John Smith"),
+                      ("jane@example.com", "Jane Doe"),
+                      ("bob@example.com", "Bob Brown")))
+    rebuild_search_index()
+
+    assert search_users("jo") == ["john.smith@example.com"]
+    assert search_users("doe") == ["jane@example.com"]
+    assert search_users("JANE@EX") == ["jane@example.com"]
+
+
+def test_prefix_matches_come_before_substring_matches():
+    save_users(_users(("bob@example.com", "Bob Goldsmith"),
+                      ("smith@example.com", "Sam Smith")))
+    rebuild_search_index()
+
+    assert search_users("smith") == ["smith@example.com", "bob@example.com"]
+
+
+def test_trigram_search_requires_the_full_substring():
+    save_users(_users(("anna@example.com", "Anna Bell"),
+                      ("ben@example.com", "Ben Bellamy")))
+    rebuild_search_index()
+
+    assert sorted(search_users("ella")) == ["ben@example.com"]
+    assert sorted(search_users("bell")) == ["anna@example.com", "ben@example.com"]
+    # Every trigram of "nnab" is missing or the substring never occurs
+    assert search_users("nnab") == []
+
+
+def test_limit_and_blank_query():
+    save_users(_users(*[(f"user{i}@example.com", f"User {i}") for i in range(10)]))
+    rebuild_search_index()
+
+    assert len(search_users("user", limit=3)) == 3
+    assert search_users("   ") == []
+
+
+def test_updates_are_appended_not_rewritten():
+    save_users(_users(("old@example.com", "Old User")))
+    rebuild_search_index()
+    with open(SEARCH_INDEX_FILE, 'r') as f:
+        before = f.read()
+
+    index_user("new@example.com", "New User")
+
+    with open(SEARCH_INDEX_FILE, 'r') as f:
+        after = f.read()
+    assert after.startswith(before)
+    assert json.loads(after[len(before):]) == {"user": "new@example.com", "name": "New User"}
+    assert search_users("new") == ["new@example.com"]
+
+
+def test_new_entries_are_replayed_from_the_log():
+    save_users(_users(("old@example.com", "Old User")))
+    rebuild_search_index()
+    with open(SEARCH_INDEX_FILE, 'a') as f:
+        f.write(json.dumps({"user": "other@example.com", "name": "Other Process"}) + "\n")
+
+    assert search_users("other") == ["other@example.com"]
+
+
+def test_records_for_uses_indexed_positions_newest_first():
+    history = [_record("a@example.com", "2026-01-01 09:00:00"),
+               _record("b@example.com", "2026-01-02 09:00:00"),
+               _record("a@example.com", "2026-01-03 09:00:00")]
+    save_users(_users(("a@example.com", "A"), ("b@example.com", "B")))
+    save_analysis(history[:2])
+    rebuild_search_index()
+
+    save_analysis(history)
+    index_analysis(history[2], 2)
+
+    assert records_for("a@example.com", history) == [history[2], history[0]]
+    assert records_for("b@example.com", history) == [history[1]]
+
+
+def test_records_for_falls_back_to_a_scan_when_positions_are_stale():
+    history = [_record("a@example.com"), _record("b@example.com")]
+    save_analysis(history)
+    rebuild_search_index()
+
+    # History rewritten behind the index's back
+    reordered = history[::-1]
+    assert records_for("a@example.com", reordered) == [history[0]]
+    assert records_for("b@example.com", reordered) == [history[1]]
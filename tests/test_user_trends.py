@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+from pages.utils import save_analysis
+from services.user_trends import (
+    DAILY_BUCKETS, WEEKLY_BUCKETS, RECENT_RECORDS, add_to_trends, build_trends,
+    load_user_trends, record_user_trend, trend_rows
+)
+
+START = datetime(2025, 1, 1, 9, 0, 0)
+
+
+def _record(day, diagnosis="None", email="a@example.com", sleep_duration=7.0):
+    return {
+        "email": email,
+        "date": (START + timedelta(days=day)).strftime("%Y-%m-%d %H:%M:%S"),
+        "diagnosis": diagnosis,
+        "sleep_duration": sleep_duration,
+        "stress_level": 5,
+        "systolic_bp": 120,
+        "diastolic_bp": 80
+    }
+
+
+def test_buckets_are_capped_to_the_newest():
+    days = 400
+    trends = build_trends([_record(day) for day in range(days)])
+
+    assert trends["count"] == days
+    assert len(trends["daily"]) == DAILY_BUCKETS
+    assert min(trends["daily"]) == (START + timedelta(days=days - DAILY_BUCKETS)).strftime("%Y-%m-%d")
+    assert len(trends["weekly"]) == WEEKLY_BUCKETS
+    assert len(trends["recent"]) == RECENT_RECORDS
+    assert trends["recent"][-1]["date"] == _record(days - 1)["date"]
+
+
+def test_same_day_records_share_a_bucket():
+    trends = build_trends([_record(0, sleep_duration=6.0), _record(0, sleep_duration=8.0)])
+
+    rows = trend_rows(trends, "daily")
+    assert len(rows) == 1
+    assert rows[0]["count"] == 2
+    assert rows[0]["sleep_duration"] == 7.0
+
+
+def test_weekly_buckets_use_iso_weeks():
+    # 2025-01-01 is a Wednesday in ISO week 1; the 6th starts week 2
+    trends = build_trends([_record(0), _record(4), _record(5)])
+
+    assert {row["period"]: row["count"] for row in trend_rows(trends, "weekly")} == {"2025-W01": 2, "2025-W02": 1}
+
+
+def test_transitions_count_diagnosis_changes_only():
+    diagnoses = ["None", "None", "Insomnia", "Insomnia", "None", "Insomnia", "Sleep Apnea"]
+    trends = build_trends([_record(day, d) for day, d in enumerate(diagnoses)])
+
+    assert trends["transitions"] == {
+        "None → Insomnia": 2,
+        "Insomnia → None": 1,
+        "Insomnia → Sleep Apnea": 1
+    }
+    assert trends["last_diagnosis"] == "Sleep Apnea"
+
+
+def test_build_trends_orders_records_by_date():
+    records = [_record(2, "Insomnia"), _record(0, "None"), _record(1, "None")]
+
+    assert build_trends(records)["transitions"] == {"None → Insomnia": 1}
+
+
+def test_incremental_updates_match_a_full_build():
+    records = [_record(day, "Insomnia" if day % 3 == 0 else "None") for day in range(120)]
+    trends = build_trends(records[:60])
+    for record in records[60:]:
+        add_to_trends(trends, record)
+
+    assert trends == build_trends(records)
+
+
+def test_record_user_trend_backfills_then_updates(workdir):
+    history = [_record(0, "None"), _record(1, "Insomnia")]
+    save_analysis(history)
+    record_user_trend(history[-1])
+    assert load_user_trends("a@example.com")["count"] == 2
+
+    history.append(_record(2, "None"))
+    save_analysis(history)
+    record_user_trend(history[-1])
+
+    trends = load_user_trends("a@example.com")
+    assert trends["count"] == 3
+    assert trends["transitions"] == {"None → Insomnia": 1, "Insomnia → None": 1}
+
+
+def test_emails_differing_in_case_keep_separate_trends(workdir):
+    history = [_record(0, email="Bob@example.com"), _record(1, email="bob@example.com")]
+    save_analysis(history)
+    for record in history:
+        record_user_trend(record)
+
+    assert load_user_trends("Bob@example.com")["count"] == 1
+    assert load_user_trends("bob@example.com")["count"] == 1
+    assert load_user_trends("BOB@example.com") is None